@@ -4,23 +4,42 @@ from __future__ import annotations
 import os
 import secrets
 import sqlite3
+import sys
 from datetime import datetime
-from typing import Callable, Dict, Tuple
+from typing import Callable, Dict
 
 from .database import Database
-from .http import Request, Response, TestClient, json_response
-from .security import hash_password, verify_password
+from .http import PayloadTooLarge, Request, Response, TestClient, json_response
+from .security import dummy_verify, hash_password, needs_rehash, verify_password
+from .sessions import create_session_cache
 
 
 Handler = Callable[[Request], Response]
 
+MAX_USERNAME_LENGTH = 64
+MAX_PASSWORD_LENGTH = 256
+
+# Constant payloads are encoded once; handlers hand out copies via Response.copy().
+_HEALTH_OK = json_response({"status": "ok"})
+_NOT_FOUND = json_response({"error": "未找到接口"}, status=404)
+_SERVER_ERROR = json_response({"error": "服务器内部错误"}, status=500)
+_PAYLOAD_TOO_LARGE = json_response({"error": "请求体过大"}, status=413)
+_BAD_CONTENT_LENGTH = json_response({"error": "Content-Length 无效"}, status=400)
+_INVALID_CREDENTIALS = json_response({"error": "用户名或密码错误"}, status=401)
+_NOT_LOGGED_IN = json_response({"error": "未登录"}, status=401)
+_LOGOUT_OK = json_response({"message": "登出成功"})
+
 
 class AuthApplication:
     def __init__(self, config: Dict[str, str]):
         self.config = config
         self.database = Database(config["DATABASE"])
         self.secret_key = config.get("SECRET_KEY", secrets.token_hex(16))
-        self.routes: Dict[Tuple[str, str], Handler] = {}
+        self.routes: Dict[str, Handler] = {}
+        self.session_cache = create_session_cache(
+            config.get("SESSION_CACHE_DIR"),
+            local=bool(config.get("SESSION_CACHE_LOCAL")),
+        )
         self._register_routes()
 
     def _register_routes(self) -> None:
@@ -31,31 +50,44 @@ class AuthApplication:
         self.add_route("GET", "/auth/me", self._current_user)
 
     def add_route(self, method: str, path: str, handler: Handler) -> None:
-        self.routes[(method.upper(), path)] = handler
+        # Keyed by "METHOD /path" so dispatch hashes one string per request.
+        self.routes[sys.intern(f"{method.upper()} {path}")] = handler
 
     def __call__(self, environ, start_response):
-        request = Request.from_environ(environ)
-        handler = self.routes.get((request.method, request.path))
-        if handler is None:
-            response = json_response({"error": "未找到接口"}, status=404)
+        try:
+            request = Request.from_environ(environ)
+        except PayloadTooLarge:
+            response = _PAYLOAD_TOO_LARGE.copy()
+        except ValueError:
+            response = _BAD_CONTENT_LENGTH.copy()
         else:
-            try:
-                response = handler(request)
-            except ValueError as exc:
-                response = json_response({"error": str(exc)}, status=400)
-            except Exception:
-                response = json_response({"error": "服务器内部错误"}, status=500)
+            response = self._dispatch(request)
         status_line, headers, body_iter = response.to_wsgi()
         start_response(status_line, headers)
         return body_iter
 
+    def _dispatch(self, request: Request) -> Response:
+        handler = self.routes.get(request.method + " " + request.path)
+        if handler is None:
+            return _NOT_FOUND.copy()
+        try:
+            return handler(request)
+        except ValueError as exc:
+            return json_response({"error": str(exc)}, status=400)
+        except Exception:
+            return _SERVER_ERROR.copy()
+
     # Public helpers -----------------------------------------------------
     def test_client(self) -> TestClient:
         return TestClient(self)
 
+    def close(self) -> None:
+        self.session_cache.close()
+        self.database.close()
+
     # Route handlers -----------------------------------------------------
     def _healthcheck(self, request: Request) -> Response:
-        return json_response({"status": "ok"})
+        return _HEALTH_OK.copy()
 
     def _register(self, request: Request) -> Response:
         payload = request.json()
@@ -79,11 +111,27 @@ class AuthApplication:
                 "SELECT id, username, password_hash FROM user WHERE username = ?",
                 (username,),
             ).fetchone()
-            if user is None or not verify_password(user["password_hash"], password):
-                return json_response({"error": "用户名或密码错误"}, status=401)
-            token = secrets.token_hex(32)
+        # Hashing runs outside the connection block so no transaction is held
+        # while it works; hashlib and argon2 release the GIL meanwhile.
+        if user is None:
+            dummy_verify(password)
+            return _INVALID_CREDENTIALS.copy()
+        if not verify_password(user["password_hash"], password):
+            return _INVALID_CREDENTIALS.copy()
+        new_hash = hash_password(password) if needs_rehash(user["password_hash"]) else None
+        token = secrets.token_urlsafe(24)
+        with self.database.connection() as conn:
+            if new_hash is not None:
+                # Rehash and session insert must land together; take the
+                # write lock up front instead of upgrading a read lock.
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "UPDATE user SET password_hash = ? WHERE id = ?",
+                    (new_hash, user["id"]),
+                )
             conn.execute(
-                "INSERT OR REPLACE INTO session (token, user_id) VALUES (?, ?)",
+                "INSERT INTO session (token, user_id) VALUES (?, ?) "
+                "ON CONFLICT(token) DO UPDATE SET user_id = excluded.user_id",
                 (token, user["id"]),
             )
         response = json_response({"message": "登录成功", "username": username})
@@ -95,41 +143,56 @@ class AuthApplication:
         if token:
             with self.database.connection() as conn:
                 conn.execute("DELETE FROM session WHERE token = ?", (token,))
-        response = json_response({"message": "登出成功"})
+            self.session_cache.invalidate(token)
+        response = _LOGOUT_OK.copy()
         response.add_header("Set-Cookie", "session=; Path=/; Max-Age=0")
         return response
 
     def _current_user(self, request: Request) -> Response:
         user = self._load_user_from_request(request)
         if user is None:
-            return json_response({"error": "未登录"}, status=401)
-        created_at = user["created_at"]
+            return _NOT_LOGGED_IN.copy()
+        user_id, username, created_at = user
         if isinstance(created_at, datetime):
             created_at = created_at.isoformat()
         return json_response(
             {
-                "id": user["id"],
-                "username": user["username"],
+                "id": user_id,
+                "username": username,
                 "created_at": created_at,
             }
         )
 
     # Helpers ------------------------------------------------------------
     def _validate_credentials(self, payload: Dict[str, str]) -> tuple[str, str]:
-        username = (payload.get("username") or "").strip()
-        password = payload.get("password") or ""
+        if not isinstance(payload, dict):
+            raise ValueError("请求体必须为 JSON 对象")
+        username = payload.get("username", "")
+        password = payload.get("password", "")
+        if not isinstance(username, str) or not isinstance(password, str):
+            raise ValueError("字段类型错误")
+        # Reject oversize input before it is stripped or hashed.
+        if len(username) > MAX_USERNAME_LENGTH or len(password) > MAX_PASSWORD_LENGTH:
+            raise ValueError("用户名或密码过长")
+        username = username.strip()
         if not username:
             raise ValueError("用户名不能为空")
         if len(password) < 6:
             raise ValueError("密码长度至少为6位")
         return username, password
 
-    def _load_user_from_request(self, request: Request):
+    def _load_user_from_request(self, request: Request) -> tuple | None:
+        """Return ``(id, username, created_at)`` for the request's session, if any."""
         token = request.cookies.get("session")
         if not token:
             return None
+        cached = self.session_cache.get(token)
+        if cached is not None:
+            return cached
         with self.database.connection() as conn:
-            row = conn.execute(
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            row = cursor.execute(
                 """
                 SELECT user.id, user.username, user.created_at
                 FROM session JOIN user ON session.user_id = user.id
@@ -137,6 +200,8 @@ class AuthApplication:
                 """,
                 (token,),
             ).fetchone()
+        if row is not None:
+            self.session_cache.add(token, row)
         return row
 
 
@@ -1,25 +1,62 @@
 """SQLite database helpers for the authentication service."""
 from __future__ import annotations
 
+import atexit
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Iterator, List
 
 
 class Database:
-    """Small wrapper around sqlite3 with context managers."""
+    """Small wrapper around sqlite3 with context managers.
+
+    Each thread keeps one open connection that is reused across requests, so
+    the hot path never pays for ``sqlite3.connect`` or the PRAGMA setup.
+    """
 
     def __init__(self, path: str) -> None:
         self.path = path
         Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        atexit.register(self.close)
         self._initialise()
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES)
+        return getattr(self._local, "conn", None) or self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        # The connection is only ever used by the thread that opened it;
+        # check_same_thread=False merely lets close() run from atexit.
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            cached_statements=256,
+        )
         conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        self._local.conn = conn
+        with self._lock:
+            self._connections.append(conn)
         return conn
 
+    def close(self) -> None:
+        """Close every cached connection, regardless of the owning thread."""
+        atexit.unregister(self.close)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
     def _initialise(self) -> None:
         with self.connection() as conn:
             conn.execute(
@@ -41,12 +78,14 @@ class Database:
                 )
                 """
             )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_user ON session(user_id)")
 
     @contextmanager
     def connection(self) -> Iterator[sqlite3.Connection]:
         conn = self._connect()
         try:
             yield conn
-            conn.commit()
-        finally:
-            conn.close()
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
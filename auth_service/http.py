@@ -4,59 +4,98 @@ from __future__ import annotations
 import io
 import json
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Callable, Dict, Iterable, List, Tuple
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
 
-@dataclass
+MAX_BODY_SIZE = 64 * 1024
+
+
+class PayloadTooLarge(ValueError):
+    """Raised when a request declares a body larger than ``MAX_BODY_SIZE``."""
+
+
+def dumps_json(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def loads_json(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+@dataclass(slots=True)
 class Request:
     method: str
     path: str
-    headers: Dict[str, str]
     body: bytes
     cookies: Dict[str, str]
+    environ: dict = field(default_factory=dict, repr=False)
+    _headers: Dict[str, str] | None = field(default=None, init=False, repr=False, compare=False)
 
     @classmethod
     def from_environ(cls, environ: dict) -> "Request":
         method = environ.get("REQUEST_METHOD", "GET").upper()
         path = environ.get("PATH_INFO", "/")
-        headers = {}
-        for key, value in environ.items():
-            if key.startswith("HTTP_"):
-                header_name = key[5:].replace("_", "-").title()
-                headers[header_name] = value
-        if "CONTENT_TYPE" in environ:
-            headers["Content-Type"] = environ["CONTENT_TYPE"]
-        if "CONTENT_LENGTH" in environ and environ["CONTENT_LENGTH"]:
-            headers["Content-Length"] = environ["CONTENT_LENGTH"]
         length = int(environ.get("CONTENT_LENGTH") or 0)
+        if length > MAX_BODY_SIZE:
+            raise PayloadTooLarge("请求体过大")
         body = environ["wsgi.input"].read(length) if length > 0 else b""
-        cookies = parse_cookies(headers.get("Cookie", ""))
-        return cls(method, path, headers, body, cookies)
+        cookies = parse_cookies(environ.get("HTTP_COOKIE", ""))
+        return cls(method, path, body, cookies, environ)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        # Handlers rarely need headers beyond the cookie, so build them on demand.
+        if self._headers is None:
+            self._headers = parse_headers(self.environ)
+        return self._headers
 
     def json(self) -> dict:
         if not self.body:
             return {}
         try:
-            return json.loads(self.body.decode("utf-8"))
+            return loads_json(self.body)
         except json.JSONDecodeError as exc:
             raise ValueError("Invalid JSON payload") from exc
 
 
+def parse_headers(environ: dict) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    for key, value in environ.items():
+        if key.startswith("HTTP_"):
+            header_name = key[5:].replace("_", "-").title()
+            headers[header_name] = value
+    if "CONTENT_TYPE" in environ:
+        headers["Content-Type"] = environ["CONTENT_TYPE"]
+    if "CONTENT_LENGTH" in environ and environ["CONTENT_LENGTH"]:
+        headers["Content-Length"] = environ["CONTENT_LENGTH"]
+    return headers
+
+
 def parse_cookies(cookie_header: str) -> Dict[str, str]:
+    # Single forward scan with str.find; no intermediate lists of parts.
     cookies: Dict[str, str] = {}
-    if not cookie_header:
-        return cookies
-    parts = [part.strip() for part in cookie_header.split(";") if part.strip()]
-    for part in parts:
-        if "=" not in part:
-            continue
-        key, value = part.split("=", 1)
-        cookies[key] = value
+    i, n = 0, len(cookie_header)
+    while i < n:
+        j = cookie_header.find(";", i)
+        if j < 0:
+            j = n
+        eq = cookie_header.find("=", i, j)
+        if eq >= 0:
+            cookies[cookie_header[i:eq].lstrip()] = cookie_header[eq + 1 : j].rstrip()
+        i = j + 1
     return cookies
 
 
-@dataclass
+@dataclass(slots=True)
 class Response:
     status: int
     headers: List[Tuple[str, str]]
@@ -65,12 +104,16 @@ class Response:
     def add_header(self, name: str, value: str) -> None:
         self.headers.append((name, value))
 
+    def copy(self) -> "Response":
+        """Return a response sharing the body bytes but owning its header list."""
+        return Response(self.status, list(self.headers), self.body)
+
     def to_wsgi(self) -> Tuple[str, List[Tuple[str, str]], Iterable[bytes]]:
-        status_line = f"{self.status} {HTTP_STATUS_MESSAGES.get(self.status, 'OK')}"
-        return status_line, self.headers, [self.body]
+        status_line = STATUS_LINES.get(self.status) or f"{self.status} OK"
+        return status_line, self.headers, (self.body,)
 
     def get_json(self) -> dict:
-        return json.loads(self.body.decode("utf-8"))
+        return loads_json(self.body)
 
 
 HTTP_STATUS_MESSAGES = {
@@ -80,12 +123,15 @@ HTTP_STATUS_MESSAGES = {
     401: "Unauthorized",
     404: "Not Found",
     405: "Method Not Allowed",
+    413: "Payload Too Large",
     500: "Internal Server Error",
 }
 
+STATUS_LINES = {code: f"{code} {message}" for code, message in HTTP_STATUS_MESSAGES.items()}
+
 
 def json_response(payload: dict, status: int = 200) -> Response:
-    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    body = dumps_json(payload)
     headers = [("Content-Type", "application/json; charset=utf-8")]
     return Response(status=status, headers=headers, body=body)
 
@@ -136,7 +182,7 @@ class TestClient:
         body = b""
         content_type = None
         if json_payload is not None:
-            body = json.dumps(json_payload).encode("utf-8")
+            body = dumps_json(json_payload)
             content_type = "application/json"
         environ = self._build_environ(method, path, body, content_type)
         status_headers: Dict[str, List[Tuple[str, str]] | str] = {}
@@ -159,11 +205,11 @@ class TestClient:
         return self.request("POST", path, json_payload)
 
 
-@dataclass
+@dataclass(slots=True)
 class TestResponse:
     status_code: int
     headers: List[Tuple[str, str]]
     data: bytes
 
     def get_json(self) -> dict:
-        return json.loads(self.data.decode("utf-8"))
+        return loads_json(self.data)
@@ -1,26 +1,124 @@
-"""Password hashing utilities using the standard library."""
+"""Password hashing utilities built on Argon2id, with a stdlib scrypt fallback."""
 from __future__ import annotations
 
 import hashlib
 import hmac
 import os
+import secrets
+import threading
 
+try:
+    from argon2 import PasswordHasher
+except ImportError:  # pragma: no cover - exercised only without argon2-cffi
+    PasswordHasher = None
+else:
+    # Outside the try so a missing name fails loudly instead of disabling Argon2.
+    # ``InvalidHash`` exists in every release; 23.1+ aliases it to ``InvalidHashError``.
+    from argon2.exceptions import InvalidHash, VerificationError, VerifyMismatchError
 
-def hash_password(password: str, *, iterations: int = 120_000) -> str:
+SCRYPT_N = 2**15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+
+_hasher = (
+    PasswordHasher(time_cost=3, memory_cost=65536, parallelism=4, hash_len=32, salt_len=16)
+    if PasswordHasher is not None
+    else None
+)
+_dummy_hash_lock = threading.Lock()
+
+
+def hash_password(password: str) -> str:
     if not isinstance(password, str):
         raise TypeError("Password must be a string")
-    salt = os.urandom(16)
-    derived = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
-    return f"{iterations}${salt.hex()}${derived.hex()}"
+    if _hasher is not None:
+        return _hasher.hash(password)
+    return _hash_scrypt(password)
 
 
 def verify_password(stored_hash: str, password: str) -> bool:
+    if not isinstance(stored_hash, str):
+        return dummy_verify(password)
+    if stored_hash.startswith("$argon2"):
+        if _hasher is None:
+            return dummy_verify(password)
+        try:
+            return _hasher.verify(stored_hash, password)
+        except (VerifyMismatchError, VerificationError):
+            return False
+        except InvalidHash:
+            return dummy_verify(password)
+    if stored_hash.startswith("scrypt$"):
+        return _verify_scrypt(stored_hash, password)
+    return _verify_legacy_pbkdf2(stored_hash, password)
+
+
+def dummy_verify(password: str) -> bool:
+    """Spend the same work as a real verification, then return False.
+
+    Used when there is no usable stored hash (unknown user, malformed row) so
+    that failures take as long as a wrong password and reveal nothing.
+    """
+    global _dummy_hash
+    dummy_hash = _dummy_hash
+    if needs_rehash(dummy_hash):
+        # Only after the hashing scheme changed at runtime; normally the hash
+        # built at import already matches.
+        with _dummy_hash_lock:
+            if needs_rehash(_dummy_hash):
+                _dummy_hash = hash_password(secrets.token_hex(16))
+            dummy_hash = _dummy_hash
+    verify_password(dummy_hash, password)
+    return False
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    """Return True when ``stored_hash`` should be upgraded to the current parameters."""
+    if _hasher is not None:
+        if not stored_hash.startswith("$argon2id$"):
+            return True
+        return _hasher.check_needs_rehash(stored_hash)
+    return not stored_hash.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p, dklen=dklen, maxmem=SCRYPT_MAXMEM
+    )
+
+
+def _hash_scrypt(password: str) -> str:
+    salt = os.urandom(16)
+    derived = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_DKLEN)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${derived.hex()}"
+
+
+def _verify_scrypt(stored_hash: str, password: str) -> bool:
+    try:
+        _, n_str, r_str, p_str, salt_hex, hash_hex = stored_hash.split("$")
+        n, r, p = int(n_str), int(r_str), int(p_str)
+        salt = bytes.fromhex(salt_hex)
+        expected = bytes.fromhex(hash_hex)
+        candidate = _scrypt(password, salt, n, r, p, len(expected))
+    except ValueError:
+        return dummy_verify(password)
+    return hmac.compare_digest(candidate, expected)
+
+
+def _verify_legacy_pbkdf2(stored_hash: str, password: str) -> bool:
+    # Hashes written before the Argon2 switch use ``iterations$salt$hash``.
     try:
         iteration_str, salt_hex, hash_hex = stored_hash.split("$")
         iterations = int(iteration_str)
-    except (ValueError, AttributeError):
-        return False
-    salt = bytes.fromhex(salt_hex)
-    expected = bytes.fromhex(hash_hex)
+        salt = bytes.fromhex(salt_hex)
+        expected = bytes.fromhex(hash_hex)
+    except ValueError:
+        return dummy_verify(password)
     candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
     return hmac.compare_digest(candidate, expected)
+
+
+# Built at import so the first unknown-user login costs the same as any other.
+_dummy_hash = hash_password(secrets.token_hex(16))
@@ -0,0 +1,179 @@
+"""Caches mapping session tokens to ``(id, username, created_at)`` user tuples."""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import stat
+import threading
+import time
+from datetime import datetime
+from collections import OrderedDict
+from typing import Tuple
+
+try:
+    import diskcache
+except ImportError:  # pragma: no cover - exercised only without diskcache
+    diskcache = None
+
+SESSION_CACHE_TTL = 60.0
+SESSION_CACHE_SIZE = 10_000
+SHARED_SESSION_CACHE_BYTES = 16 * 1024 * 1024
+SHARED_SESSION_CACHE_TIMEOUT = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """Bounded in-process LRU with a per-entry TTL, private to one worker."""
+
+    def __init__(self, ttl: float = SESSION_CACHE_TTL, max_size: int = SESSION_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        # A ``None`` user marks a tombstone left by a logout.
+        self._entries: OrderedDict[str, Tuple[float, tuple | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> tuple | None:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(token)
+            if cached is None:
+                return None
+            if now - cached[0] >= self.ttl:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return cached[1]
+
+    def add(self, token: str, user: tuple) -> None:
+        """Cache ``user`` unless a live entry (or tombstone) already exists."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(token)
+            if cached is not None and now - cached[0] < self.ttl:
+                return
+            self._store(token, (now, user))
+
+    def invalidate(self, token: str) -> None:
+        """Replace the entry with a tombstone so a racing ``add`` cannot revive it."""
+        with self._lock:
+            self._store(token, (time.monotonic(), None))
+
+    def _store(self, token: str, entry: Tuple[float, tuple | None]) -> None:
+        self._entries[token] = entry
+        self._entries.move_to_end(token)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class NullSessionCache:
+    """Caches nothing, so every lookup reads the database.
+
+    The default: a per-process cache would let other workers keep serving a
+    session after it is logged out in one of them.
+    """
+
+    def get(self, token: str) -> tuple | None:
+        return None
+
+    def add(self, token: str, user: tuple) -> None:
+        pass
+
+    def invalidate(self, token: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SharedSessionCache:
+    """Session cache in a diskcache directory shared by every worker process.
+
+    The directory must belong to the current user and is locked down to
+    ``0o700``, since the entries are live session tokens. Values are stored as
+    JSON, never pickled. Cache failures are logged and treated as misses so
+    lookups fall through to the database.
+    """
+
+    def __init__(self, directory: str, ttl: float = SESSION_CACHE_TTL) -> None:
+        self.ttl = ttl
+        _prepare_private_directory(directory)
+        # Least-recently-stored eviction: LRU would turn every read into a write.
+        self._cache = diskcache.Cache(
+            directory,
+            disk=diskcache.JSONDisk,
+            eviction_policy="least-recently-stored",
+            size_limit=SHARED_SESSION_CACHE_BYTES,
+            timeout=SHARED_SESSION_CACHE_TIMEOUT,
+        )
+
+    def get(self, token: str) -> tuple | None:
+        try:
+            cached = self._cache.get(token)
+        except (sqlite3.Error, OSError, ValueError, diskcache.Timeout):
+            logger.exception("Shared session cache lookup failed")
+            return None
+        return tuple(cached) if cached is not None else None
+
+    def add(self, token: str, user: tuple) -> None:
+        user_id, username, created_at = user
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+        try:
+            # Cache.add never overwrites, so a logout tombstone always wins.
+            self._cache.add(token, [user_id, username, created_at], expire=self.ttl)
+        except (sqlite3.Error, OSError, diskcache.Timeout):
+            logger.exception("Shared session cache write failed")
+
+    def invalidate(self, token: str) -> None:
+        try:
+            self._cache.set(token, None, expire=self.ttl)
+        except (sqlite3.Error, OSError, diskcache.Timeout):
+            logger.exception(
+                "Shared session cache invalidation failed; other workers may "
+                "serve the session until it expires"
+            )
+
+    def close(self) -> None:
+        self._cache.close()
+
+
+def _prepare_private_directory(directory: str) -> None:
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if stat.S_ISLNK(info.st_mode) or not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"Session cache path is not a plain directory: {directory}")
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"Session cache directory is owned by another user: {directory}")
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(directory, 0o700)
+
+
+SessionCacheType = NullSessionCache | SessionCache | SharedSessionCache
+
+
+def create_session_cache(directory: str | None, *, local: bool = False) -> SessionCacheType:
+    """Pick the session cache for a deployment.
+
+    A configured ``directory`` gives the cache shared by all workers. ``local``
+    enables the in-process cache, which is only safe with a single worker
+    process. Otherwise, or when the shared cache cannot be opened safely,
+    nothing is cached.
+    """
+    if directory:
+        if diskcache is None:
+            logger.warning("SESSION_CACHE_DIR is set but diskcache is missing; session caching disabled")
+            return NullSessionCache()
+        try:
+            return SharedSessionCache(directory)
+        except (sqlite3.Error, OSError, diskcache.Timeout):
+            logger.exception("Cannot open shared session cache at %s; session caching disabled", directory)
+            return NullSessionCache()
+    if local:
+        return SessionCache()
+    return NullSessionCache()
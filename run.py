@@ -1,17 +1,51 @@
-"""Run the authentication service using Python's built-in WSGI server."""
+"""Run the authentication service under gunicorn, or wsgiref when it is unavailable."""
 from __future__ import annotations
 
-from wsgiref.simple_server import make_server
+import os
 
-from auth_service import create_app
+HOST = "127.0.0.1"
+PORT = 5000
 
 
-def main() -> None:
-    app = create_app()
-    with make_server("127.0.0.1", 5000, app) as httpd:
-        print("Serving on http://127.0.0.1:5000")
+def serve_gunicorn() -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornServer(BaseApplication):
+        def load_config(self) -> None:
+            self.cfg.set("bind", f"{HOST}:{PORT}")
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("workers", os.cpu_count() or 1)
+            self.cfg.set("threads", 8)
+            self.cfg.set("timeout", 30)
+
+        def load(self):
+            from wsgi import application
+
+            return application
+
+    GunicornServer().run()
+
+
+def serve_wsgiref() -> None:
+    from wsgiref.simple_server import make_server
+
+    from auth_service import create_app
+
+    # A single process, so the in-process session cache is safe here.
+    app = create_app({"SESSION_CACHE_LOCAL": "1"})
+    with make_server(HOST, PORT, app) as httpd:
+        print(f"Serving on http://{HOST}:{PORT}")
         httpd.serve_forever()
 
 
+def main() -> None:
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        serve_wsgiref()
+    else:
+        serve_gunicorn()
+
+
 if __name__ == "__main__":
     main()
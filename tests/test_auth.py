@@ -1,25 +1,40 @@
 from __future__ import annotations
 
+import hashlib
+import io
 import os
+import sqlite3
 import sys
 
 import pytest
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from auth_service import create_app
+from auth_service import create_app, security
+from auth_service.http import MAX_BODY_SIZE, parse_cookies
+from auth_service.sessions import (
+    NullSessionCache,
+    SessionCache,
+    SharedSessionCache,
+    create_session_cache,
+)
 
 
 @pytest.fixture()
-def app(tmp_path):
+def app(request, tmp_path):
     test_db = tmp_path / "test.sqlite"
-    application = create_app(
-        {
-            "DATABASE": str(test_db),
-            "SECRET_KEY": "test",
-        }
-    )
+    config = {
+        "DATABASE": str(test_db),
+        "SECRET_KEY": "test",
+    }
+    cache_mode = getattr(request, "param", "default")
+    if cache_mode == "shared":
+        config["SESSION_CACHE_DIR"] = str(tmp_path / "sessions")
+    elif cache_mode == "local":
+        config["SESSION_CACHE_LOCAL"] = "1"
+    application = create_app(config)
     yield application
+    application.close()
 
 
 @pytest.fixture()
@@ -61,3 +76,172 @@ def test_validation_errors(client):
 
     response = client.post("/auth/login", {})
     assert response.status_code == 400
+
+
+def test_legacy_pbkdf2_hash_is_upgraded_on_login(app, client):
+    pytest.importorskip("argon2")
+
+    salt = bytes(16)
+    derived = hashlib.pbkdf2_hmac("sha256", b"secret1", salt, 1_000)
+    legacy_hash = f"1000${salt.hex()}${derived.hex()}"
+    with app.database.connection() as conn:
+        conn.execute(
+            "INSERT INTO user (username, password_hash) VALUES (?, ?)",
+            ("bob", legacy_hash),
+        )
+
+    response = client.post("/auth/login", {"username": "bob", "password": "secret1"})
+    assert response.status_code == 200
+
+    with app.database.connection() as conn:
+        stored = conn.execute("SELECT password_hash FROM user WHERE username = ?", ("bob",)).fetchone()
+    assert stored["password_hash"].startswith("$argon2id$")
+
+
+def test_scrypt_fallback_without_argon2(monkeypatch):
+    monkeypatch.setattr(security, "_hasher", None)
+    stored = security.hash_password("secret1")
+    assert stored.startswith("scrypt$")
+    assert security.verify_password(stored, "secret1")
+    assert not security.verify_password(stored, "wrongpass")
+    assert not security.needs_rehash(stored)
+
+
+def test_malformed_stored_hash_is_rejected():
+    assert not security.verify_password("not-a-hash", "secret1")
+    assert not security.verify_password("$argon2id$broken", "secret1")
+    assert not security.verify_password("scrypt$x$y$z$00$00", "secret1")
+
+
+def test_parse_cookies():
+    assert parse_cookies("") == {}
+    assert parse_cookies("session=abc") == {"session": "abc"}
+    assert parse_cookies(" a=1 ; b=x=y;;flag; c=3") == {"a": "1", "b": "x=y", "c": "3"}
+
+
+def test_oversize_and_non_string_credentials_are_rejected(client):
+    response = client.post("/auth/register", {"username": "a" * 65, "password": "secret1"})
+    assert response.status_code == 400
+
+    response = client.post("/auth/register", {"username": "alice", "password": "x" * 257})
+    assert response.status_code == 400
+
+    response = client.post("/auth/login", {"username": 123, "password": "secret1"})
+    assert response.status_code == 400
+
+    response = client.post("/auth/login", {"username": 0, "password": False})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "字段类型错误"
+
+    response = client.post("/auth/login", [1])
+    assert response.status_code == 400
+
+
+def test_oversize_body_is_rejected(client):
+    response = client.post("/auth/login", {"username": "alice", "password": "x" * 70_000})
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize(
+    ("content_length", "expected_status"),
+    [("abc", 400), (str(MAX_BODY_SIZE + 1), 413), (str(MAX_BODY_SIZE), 400)],
+)
+def test_content_length_is_checked_before_reading(app, content_length, expected_status):
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": "/auth/login",
+        "CONTENT_LENGTH": content_length,
+        "wsgi.input": io.BytesIO(b"{}"),
+    }
+    captured = {}
+
+    def start_response(status, headers):
+        captured["status"] = status
+
+    app(environ, start_response)
+    assert int(captured["status"].split()[0]) == expected_status
+
+
+@pytest.mark.parametrize("app", ["shared"], indirect=True)
+def test_shared_session_cache_directory_is_private(app):
+    assert isinstance(app.session_cache, SharedSessionCache)
+    assert os.stat(app.config["SESSION_CACHE_DIR"]).st_mode & 0o777 == 0o700
+
+
+@pytest.mark.parametrize("app", ["default", "shared"], indirect=True)
+def test_logout_is_seen_by_other_workers(app):
+    other = create_app(dict(app.config))
+    try:
+        first, second = app.test_client(), other.test_client()
+        first.post("/auth/register", {"username": "carol", "password": "secret1"})
+        first.post("/auth/login", {"username": "carol", "password": "secret1"})
+        second.cookies.update(first.cookies)
+
+        assert second.get("/auth/me").status_code == 200
+        first.post("/auth/logout")
+        assert second.get("/auth/me").status_code == 401
+    finally:
+        other.close()
+
+
+def test_in_process_session_cache_expires_and_evicts():
+    cache = SessionCache(ttl=60.0, max_size=2)
+    cache.add("a", (1, "alice", None))
+    cache.add("b", (2, "bob", None))
+    cache.get("a")
+    cache.add("c", (3, "carol", None))
+    assert cache.get("b") is None
+    assert cache.get("a") == (1, "alice", None)
+
+    cache.invalidate("a")
+    cache.add("a", (1, "alice", None))
+    assert cache.get("a") is None
+
+    cache.ttl = 0.0
+    assert cache.get("c") is None
+
+
+@pytest.mark.parametrize("app", ["local", "shared"], indirect=True)
+def test_logout_racing_session_lookup_does_not_revive_session(app, client, monkeypatch):
+    client.post("/auth/register", {"username": "dave", "password": "secret1"})
+    client.post("/auth/login", {"username": "dave", "password": "secret1"})
+    other = app.test_client()
+    other.cookies.update(client.cookies)
+
+    original_add = app.session_cache.add
+
+    def add_after_logout(token, user):
+        # The lookup has read the row; a logout lands before it is cached.
+        other.post("/auth/logout")
+        original_add(token, user)
+
+    monkeypatch.setattr(app.session_cache, "add", add_after_logout)
+    client.get("/auth/me")
+    monkeypatch.undo()
+
+    assert client.get("/auth/me").status_code == 401
+
+
+def test_session_cache_selection(tmp_path):
+    target = tmp_path / "target"
+    target.mkdir()
+    link = tmp_path / "link"
+    link.symlink_to(target)
+    assert isinstance(create_session_cache(str(link)), NullSessionCache)
+    assert isinstance(create_session_cache(None), NullSessionCache)
+    assert isinstance(create_session_cache(None, local=True), SessionCache)
+
+
+@pytest.mark.parametrize("app", ["shared"], indirect=True)
+def test_shared_session_cache_errors_fall_through_to_database(app, client, monkeypatch):
+    def broken(*args, **kwargs):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    client.post("/auth/register", {"username": "erin", "password": "secret1"})
+    client.post("/auth/login", {"username": "erin", "password": "secret1"})
+    monkeypatch.setattr(app.session_cache._cache, "get", broken)
+    monkeypatch.setattr(app.session_cache._cache, "add", broken)
+
+    response = client.get("/auth/me")
+    assert response.status_code == 200
+    assert response.get_json()["username"] == "erin"
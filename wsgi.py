@@ -0,0 +1,18 @@
+"""WSGI entry point for production servers, e.g. ``gunicorn wsgi:application``.
+
+Workers share one session cache so a logout takes effect in all of them. It
+lives in ``instance/sessions`` unless ``AUTH_SESSION_CACHE_DIR`` points at a
+private directory elsewhere (for example under ``/dev/shm``).
+"""
+from __future__ import annotations
+
+import os
+
+from auth_service import create_app
+
+application = create_app(
+    {
+        "SESSION_CACHE_DIR": os.environ.get("AUTH_SESSION_CACHE_DIR")
+        or os.path.join(os.getcwd(), "instance", "sessions"),
+    }
+)